@@ -39,6 +39,7 @@ LOGGING = {
             'filename': os.path.join(LOGS_DIR, "debug.log"),
             'maxBytes': 10 * 1024 * 1024,  # 10 MB
             'backupCount': 10,
+            'delay': True,  # open the file on first write, not at worker boot
         },
         'warnings_file': {
             'level': 'WARNING',
@@ -47,6 +48,7 @@ LOGGING = {
             'filename': os.path.join(LOGS_DIR, "warnings.log"),
             'maxBytes': 10 * 1024 * 1024,  # 10 MB
             'backupCount': 10,
+            'delay': True,  # open the file on first write, not at worker boot
         },
     },  # handlers
     'loggers': {
@@ -1,11 +1,11 @@
 
 import os
+from importlib.util import find_spec
 
 from .local_settings import (
     SECRET_KEY, DEBUG, ALLOWED_HOSTS, DB_CONFIG,
     TEMPLATES_DIR, STATICFILES_DIR, STATIC_DIR, MEDIA_DIR, LOGS_DIR, EMAIL_HOST_USER, EMAIL_HOST_PASSWORD,DEFAULT_FROM_EMAIL
 )
-from Dental.logging import LOGGING
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 SETTINGS_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -30,21 +30,34 @@ ALLOWED_HOSTS = ALLOWED_HOSTS
 
 # Application definition
 
+# 'production' keeps workers lean: dev-only apps are never imported there.
+DJANGO_PROFILE = os.getenv('DJANGO_PROFILE', 'development')
+
+# Admin theme, used in every profile when it is installed
+THEME_APPS = ['jazzmin']
+# Development helpers, skipped in production and when not installed
+DEV_APPS = ['django_extensions']
+
 INSTALLED_APPS = [
-    'jazzmin',
+    *[app for app in THEME_APPS if find_spec(app)],
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'django_extensions',
     'accounts',
     'HomeView'
 ]
+if DJANGO_PROFILE != 'production':
+    INSTALLED_APPS += [app for app in DEV_APPS if find_spec(app)]
 
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.EmailBackend',
+]
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -125,17 +138,28 @@ STATICFILES_DIRS = [STATICFILES_DIR, ]  # development environment
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = MEDIA_DIR
+# '' streams through Django; 'x-accel' (nginx) or 'x-sendfile' (Apache) in production
+MEDIA_SERVE_BACKEND = os.getenv('MEDIA_SERVE_BACKEND', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'  # nginx `internal` location
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Login history (accounts.events) ---------------------------------------------
+LOGIN_EVENTS = {
+    'BATCH_SIZE': 500,  # flush after this many buffered events...
+    'FLUSH_INTERVAL_MS': 1000,  # ...or after this long, whichever comes first
+    'BACKGROUND': True,
+}
 # Logging ---------------------------------------------------------------------
 # https://docs.djangoproject.com/en/3.1/topics/logging/
 
 if os.getenv('DISABLE_LOGGING', False):  # for celery in jenkins ci only
     LOGGING_CONFIG = None
-LOGGING = LOGGING  # logging.py
+else:
+    from Dental.logging import LOGGING  # logging.py
 
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -144,4 +168,7 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = EMAIL_HOST_USER
 EMAIL_HOST_PASSWORD = EMAIL_HOST_PASSWORD
-DEFAULT_FROM_EMAIL = DEFAULT_FROM_EMAIL
\ No newline at end of file
+DEFAULT_FROM_EMAIL = DEFAULT_FROM_EMAIL
+
+# Startup budget checked by `manage.py importtime --check` (milliseconds)
+STARTUP_IMPORT_BUDGET_MS = int(os.getenv('STARTUP_IMPORT_BUDGET_MS', 1500))
@@ -2,16 +2,17 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from accounts.views import ProtectedMediaView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('accounts.urls')),
     path('', include('HomeView.urls')),
+    # media files go through an auth check in every environment; in production
+    # the bytes are offloaded to the web server (see accounts/media.py)
+    path(
+        settings.MEDIA_URL.lstrip('/') + '<path:path>',
+        ProtectedMediaView.as_view(),
+        name='protected_media'
+    ),
 ]
-# serve media files in development environment --------------------------------
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT
-    )
@@ -1,7 +1,50 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
 from django.utils.html import format_html
-from .models import CustomUser, EmailOTP
+from django.db.models import Case, Q, Sum, Value, When
+from .models import CustomUser, EmailOTP, LoginEvent, EnrollmentStat, ENROLLMENT_STAT_FIELDS
+from .search import reindex_users
+from .utils import queue_otp_emails
+
+BULK_CHUNK_SIZE = 1000
+
+def update_in_chunks(queryset, chunk_size=BULK_CHUNK_SIZE, **values):
+    """
+    Apply ``values`` with one UPDATE per ``chunk_size`` selected rows, bypassing
+    CustomUser.save(). Chunking keeps each statement's lock short and its
+    parameter list within database limits. Returns the list of updated ids.
+
+    EnrollmentStat is adjusted per chunk from grouped counts taken before and
+    after the UPDATE, so it costs two queries per chunk rather than per user.
+    """
+    ids = list(queryset.order_by().values_list('pk', flat=True))
+    track_stats = bool(set(values) & set(ENROLLMENT_STAT_FIELDS))
+    for start in range(0, len(ids), chunk_size):
+        chunk = queryset.model._default_manager.filter(pk__in=ids[start:start + chunk_size])
+        if track_stats:
+            before = EnrollmentStat.objects.count_buckets(chunk)
+        chunk.update(**values)
+        if track_stats:
+            deltas = EnrollmentStat.objects.count_buckets(chunk)
+            deltas.subtract(before)
+            EnrollmentStat.objects.apply(deltas, queryset.db)
+    return ids
+
+def assign_student_ids(ids, using):
+    """Give the students among ``ids`` that have no student ID one, in a single UPDATE."""
+    users = CustomUser.objects.using(using)
+    missing = list(
+        users.filter(Q(student_id__isnull=True) | Q(student_id=''), pk__in=ids, role='student')
+        .order_by('pk').values_list('pk', flat=True)
+    )
+    if not missing:
+        return
+    student_ids = CustomUser.allocate_student_ids(len(missing), using)
+    users.filter(pk__in=missing).update(student_id=Case(
+        *[When(pk=pk, then=Value(student_id)) for pk, student_id in zip(missing, student_ids)]
+    ))
 
 class CustomUserAdmin(UserAdmin):
     model = CustomUser
@@ -43,6 +86,60 @@ class CustomUserAdmin(UserAdmin):
     )
 
     readonly_fields = ('student_id', 'profile_image_preview', 'last_login_ip', 'session_key')
+    actions = (
+        'mark_email_verified', 'activate_users', 'deactivate_users',
+        'make_students', 'make_teachers', 'make_admins', 'resend_verification',
+    )
+
+    @admin.action(description='Mark selected users as email verified')
+    def mark_email_verified(self, request, queryset):
+        ids = update_in_chunks(queryset, is_email_verified=True)
+        self.message_user(request, f'{len(ids)} users marked as verified.', messages.SUCCESS)
+
+    @admin.action(description='Activate selected users')
+    def activate_users(self, request, queryset):
+        ids = update_in_chunks(queryset, is_active=True)
+        self.message_user(request, f'{len(ids)} users activated.', messages.SUCCESS)
+
+    @admin.action(description='Deactivate selected users')
+    def deactivate_users(self, request, queryset):
+        ids = update_in_chunks(queryset, is_active=False)
+        self.message_user(request, f'{len(ids)} users deactivated.', messages.SUCCESS)
+
+    @admin.action(description='Change role of selected users to Student')
+    def make_students(self, request, queryset):
+        self.change_role(request, queryset, 'student')
+
+    @admin.action(description='Change role of selected users to Teacher')
+    def make_teachers(self, request, queryset):
+        self.change_role(request, queryset, 'teacher')
+
+    @admin.action(description='Change role of selected users to Admin')
+    def make_admins(self, request, queryset):
+        self.change_role(request, queryset, 'admin')
+
+    def change_role(self, request, queryset, role):
+        ids = update_in_chunks(queryset, role=role)
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            chunk = ids[start:start + BULK_CHUNK_SIZE]
+            # update() skips save(), so users that never were students still
+            # need an ID: allocate the chunk's IDs together, write them in one UPDATE.
+            assign_student_ids(chunk, queryset.db)
+            reindex_users(chunk, queryset.db)
+        self.message_user(request, f'{len(ids)} users changed to {role}.', messages.SUCCESS)
+
+    @admin.action(description='Resend verification code to selected unverified users')
+    def resend_verification(self, request, queryset):
+        users = list(
+            queryset.filter(is_email_verified=False)
+            .only('id', 'email', 'first_name', 'last_name')
+            .order_by()
+        )
+        queued = queue_otp_emails(users)
+        self.message_user(
+            request, f'Verification code queued for {queued} users; delivery failures are logged.',
+            messages.SUCCESS,
+        )
 
     def profile_image_preview(self, obj):
         if obj.profile_photo:
@@ -57,5 +154,62 @@ class EmailOTPAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at',)
     ordering = ('-created_at',)
 
+class LoginEventAdmin(admin.ModelAdmin):
+    list_display = ('email', 'user', 'outcome', 'ip_address', 'created_at')
+    list_filter = ('outcome', 'created_at')
+    search_fields = ('email', 'ip_address')
+    date_hierarchy = 'created_at'
+    list_select_related = ('user',)
+    ordering = ('-created_at',)
+
+    # Login history is append-only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+class EnrollmentStatAdmin(admin.ModelAdmin):
+    """
+    Enrollment dashboard. Every figure is summed from EnrollmentStat, so a
+    page load costs O(buckets), not O(users).
+    """
+    change_list_template = 'admin/accounts/enrollmentstat/dashboard.html'
+    list_display = ('year', 'educational_institute', 'is_email_verified', 'students')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        totals = {
+            'total': Sum('students'),
+            'verified': Sum('students', filter=Q(is_email_verified=True)),
+            'unverified': Sum('students', filter=Q(is_email_verified=False)),
+        }
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        stats = EnrollmentStat.objects.filter(students__gt=0)
+        # Rendered without a ChangeList, whose count and page queries the
+        # dashboard never shows
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Enrollment dashboard',
+            'overall': stats.aggregate(**totals),
+            'by_year': stats.values('year').annotate(**totals).order_by('-year'),
+            'by_institute': stats.values('educational_institute').annotate(**totals).order_by('-total'),
+            **(extra_context or {}),
+        }
+        request.current_app = self.admin_site.name
+        return TemplateResponse(request, self.change_list_template, context)
+
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(EmailOTP, EmailOTPAdmin)
+admin.site.register(LoginEvent, LoginEventAdmin)
+admin.site.register(EnrollmentStat, EnrollmentStatAdmin)
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models.functions import Lower
+
+UserModel = get_user_model()
+
+# Columns touched by authenticate() -> login() -> LoginView, so none of them
+# triggers a deferred-field query later in the request.
+AUTH_FIELDS = (
+    'id', 'email', 'password', 'first_name', 'role', 'student_id',
+    'is_active', 'is_email_verified', 'last_login', 'last_login_ip', 'session_key',
+)
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticate by email with a single lookup on the Lower(email) index.
+
+    Callers no longer have to lowercase the email before authenticate(); the
+    admin login form (which posts ``username``) goes through here as well.
+    """
+
+    def authenticate(self, request, email=None, password=None, username=None, **kwargs):
+        if email is None:
+            email = username if username is not None else kwargs.get(UserModel.USERNAME_FIELD)
+        if email is None or password is None:
+            return None
+        user = (
+            UserModel._default_manager
+            .alias(email_lower=Lower('email'))
+            .filter(email_lower=email.strip().lower())
+            .only(*AUTH_FIELDS)
+            .first()
+        )
+        if user is None:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user.
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,120 @@
+"""
+Buffered, batched writes of LoginEvent rows.
+
+Events are queued in memory and written with a single bulk_create once
+BATCH_SIZE events are pending or FLUSH_INTERVAL_MS has passed, whichever comes
+first. A daemon thread handles the time-based flush and an atexit hook drains
+whatever is left when the worker shuts down.
+
+Settings (all optional)::
+
+    LOGIN_EVENTS = {
+        'BATCH_SIZE': 500,
+        'FLUSH_INTERVAL_MS': 1000,
+        'BACKGROUND': True,  # False: flush inline from add(), no thread
+    }
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import LoginEvent
+from .utils import get_client_ip
+
+logger = logging.getLogger('customauth')
+
+DEFAULTS = {
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL_MS': 1000,
+    'BACKGROUND': True,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'LOGIN_EVENTS', {})}
+
+
+class LoginEventBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._exit_hook_registered = False
+
+    def add(self, event):
+        config = get_config()
+        with self._lock:
+            self._pending.append(event)
+            pending = len(self._pending)
+        if config['BACKGROUND']:
+            self._ensure_thread()
+            if pending >= config['BATCH_SIZE']:
+                self._wakeup.set()
+        elif (pending >= config['BATCH_SIZE']
+              or time.monotonic() - self._last_flush >= config['FLUSH_INTERVAL_MS'] / 1000):
+            self.flush()
+
+    def flush(self):
+        """Write every pending event; returns the number of rows written."""
+        with self._lock:
+            events, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+        if not events:
+            return 0
+        try:
+            LoginEvent.objects.bulk_create(events, batch_size=get_config()['BATCH_SIZE'])
+        except Exception:
+            # Login history must never break logins; log and drop the batch.
+            logger.exception('Failed to write %d login events', len(events))
+            return 0
+        return len(events)
+
+    def stop(self):
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name='login-event-flusher', daemon=True
+            )
+            self._thread.start()
+            if not self._exit_hook_registered:
+                atexit.register(self.stop)
+                self._exit_hook_registered = True
+
+    def _run(self):
+        while not self._stopping:
+            self._wakeup.wait(get_config()['FLUSH_INTERVAL_MS'] / 1000)
+            self._wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+
+login_events = LoginEventBuffer()
+
+
+def record_login_event(request, email, outcome, user=None):
+    # LoginForm accepts longer emails than the column holds; one oversized value
+    # would fail the whole batched INSERT on PostgreSQL.
+    login_events.add(LoginEvent(
+        user=user,
+        email=email[:LoginEvent._meta.get_field('email').max_length],
+        ip_address=get_client_ip(request),
+        user_agent=request.META.get('HTTP_USER_AGENT', '')[:255],
+        outcome=outcome,
+    ))
@@ -1,14 +1,55 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
+from django.db.models import Q
+from django.db.models.functions import Lower
 from .models import CustomUser
 
 class RegisterForm(UserCreationForm):
-    phone_number = forms.CharField(max_length=15)
+    phone_number = forms.CharField(max_length=15, validators=[CustomUser.phone_regex])
+
+    # Checked together by validate_unique() instead of one query per field
+    # (plus one more for the Lower(email) constraint).
+    single_query_unique_fields = ('email', 'phone_number')
 
     class Meta:
         model = CustomUser
         fields = ['first_name', 'last_name', 'email', 'phone_number', 'password1', 'password2']
 
+    def clean_email(self):
+        # The view copies email into username, so normalise it once here.
+        return self.cleaned_data['email'].lower()
+
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        exclude.update(self.single_query_unique_fields)
+        return exclude
+
+    def validate_unique(self):
+        email = self.cleaned_data.get('email')
+        phone_number = self.cleaned_data.get('phone_number')
+        lookups = Q()
+        if email:
+            lookups |= Q(email_lower=email) | Q(username=email)
+        if phone_number:
+            lookups |= Q(phone_number=phone_number)
+        if not lookups:
+            return
+        clashes = (
+            CustomUser.objects
+            .alias(email_lower=Lower('email'))
+            .filter(lookups)
+            .values_list('email', 'username', 'phone_number')
+        )
+        taken = set()
+        for other_email, other_username, other_phone in clashes:
+            if email and email in (other_email.lower(), other_username):
+                taken.add('email')
+            if phone_number and phone_number == other_phone:
+                taken.add('phone_number')
+        for field in self.single_query_unique_fields:
+            if field in taken:
+                self.add_error(field, self.instance.unique_error_message(CustomUser, [field]))
+
 class LoginForm(forms.Form):
     email = forms.EmailField()
     password = forms.CharField(widget=forms.PasswordInput)
@@ -0,0 +1,300 @@
+"""
+End-to-end load test of the accounts flows.
+
+Each simulated client repeatedly runs register -> verify -> login -> profile ->
+logout over real HTTP against a threaded WSGI server started in-process, on a
+throwaway test database (a temporary SQLite file, or test_<NAME> on
+PostgreSQL). OTPs are read back from the locmem email outbox.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.core import mail
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from accounts.events import login_events
+
+OTP_RE = re.compile(r'\b(\d{6})\b')
+VERIFY_RE = re.compile(r'/accounts/verify/(\d+)/')
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+PASSWORD = 'Bench-pass-2025!x'
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil
+    return ordered[int(rank) - 1]
+
+
+def summarize(samples):
+    """
+    Per-endpoint stats from ``{endpoint: [(seconds, queries, ok), ...]}``.
+    Throughput is reported once for the whole run: every flow hits every
+    endpoint, so a per-endpoint rate would just repeat the run's rate.
+    """
+    report = {}
+    for endpoint, rows in samples.items():
+        latencies = [seconds * 1000 for seconds, _, _ in rows]
+        report[endpoint] = {
+            'requests': len(rows),
+            'errors': sum(1 for _, _, ok in rows if not ok),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries_per_request': round(sum(q for _, q, _ in rows) / len(rows), 2) if rows else 0.0,
+        }
+    return report
+
+
+class QueryCountingHandler:
+    """WSGI wrapper that reports the request's query count in X-Query-Count."""
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        count = [0]
+
+        def counter(execute, sql, params, many, context):
+            count[0] += 1
+            return execute(sql, params, many, context)
+
+        def counting_start_response(status, headers, exc_info=None):
+            return start_response(status, [*headers, ('X-Query-Count', str(count[0]))], exc_info)
+
+        with connection.execute_wrapper(counter):
+            return self.application(environ, counting_start_response)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None  # surface 3xx as HTTPError so the flow can inspect Location
+
+
+class FlowClient:
+    """One browser-like client: its own cookies, CSRF token and samples."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), NoRedirect())
+        self.samples = defaultdict(list)
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), '')
+
+    def request(self, endpoint, path, data=None, expect=200):
+        body = None
+        if data is not None:
+            body = urlencode({**data, 'csrfmiddlewaretoken': self.csrf_token()}).encode()
+        request = Request(self.base_url + path, data=body, headers={'User-Agent': 'benchmark_accounts'})
+        started = time.perf_counter()
+        try:
+            response = self.opener.open(request, timeout=60)
+        except HTTPError as e:
+            response = e
+        response.read()
+        elapsed = time.perf_counter() - started
+        ok = response.status == expect
+        self.samples[endpoint].append((elapsed, int(response.headers.get('X-Query-Count', 0)), ok))
+        if not ok:
+            raise RuntimeError(f'{endpoint}: expected {expect}, got {response.status}')
+        return response.headers
+
+    def run_flow(self, email, phone_number):
+        self.request('register_form', '/accounts/register/')
+        headers = self.request('register', '/accounts/register/', {
+            'first_name': 'Bench', 'last_name': 'User', 'email': email,
+            'phone_number': phone_number, 'password1': PASSWORD, 'password2': PASSWORD,
+        }, expect=302)
+        user_id = VERIFY_RE.search(headers['Location']).group(1)
+        self.request('verify', f'/accounts/verify/{user_id}/', {'otp': latest_otp(email)}, expect=302)
+        self.request('login', '/accounts/login/', {'email': email, 'password': PASSWORD}, expect=302)
+        self.request('profile', '/accounts/profile/')
+        self.request('logout', '/accounts/logout/', expect=302)
+
+
+def latest_otp(email):
+    for message in reversed(mail.outbox):
+        if email in message.to:
+            return OTP_RE.search(message.body).group(1)
+    raise RuntimeError(f'No OTP email sent to {email}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test register -> verify -> login -> profile -> logout with concurrent '
+        'clients against a local server and a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8, help='Concurrent clients.')
+        parser.add_argument('--flows', type=int, default=10, help='Full flows per client.')
+        parser.add_argument(
+            '--fast-hashers', action='store_true',
+            help='Use MD5 password hashing to measure app overhead rather than PBKDF2.',
+        )
+        parser.add_argument(
+            '--output', help='Where to save JSON results (default: benchmarks/accounts-<timestamp>.json).',
+        )
+        parser.add_argument('--compare', help='Earlier JSON results to compare against.')
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['flows'] < 1:
+            raise CommandError('--clients and --flows must be at least 1.')
+
+        overrides = {'ALLOWED_HOSTS': ['127.0.0.1', 'localhost'], 'DEBUG': False}
+        if options['fast_hashers']:
+            overrides['PASSWORD_HASHERS'] = FAST_HASHERS
+        setup_test_environment()  # locmem email backend and mail.outbox
+        try:
+            with override_settings(**overrides):
+                old_name, tmpdir = self.create_database()
+                try:
+                    elapsed, samples, failures = self.run_load(options['clients'], options['flows'])
+                    login_events.flush()
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+                    if tmpdir:
+                        tmpdir.cleanup()
+        finally:
+            teardown_test_environment()
+
+        results = {
+            'meta': {
+                'started_at': datetime.now(timezone.utc).isoformat(),
+                'clients': options['clients'],
+                'flows_per_client': options['flows'],
+                'database': connection.vendor,
+                'password_hashers': 'fast' if options['fast_hashers'] else 'default',
+                'elapsed_s': round(elapsed, 3),
+                'failed_flows': len(failures),
+                'failure_samples': failures[:5],
+                'flows_per_s': round((options['clients'] * options['flows'] - len(failures)) / elapsed, 2),
+                'requests_per_s': round(sum(len(rows) for rows in samples.values()) / elapsed, 2),
+            },
+            'endpoints': summarize(samples),
+        }
+        self.print_report(results)
+        if options['compare']:
+            self.print_comparison(results, options['compare'])
+        self.save(results, options['output'])
+
+    def create_database(self):
+        tmpdir = None
+        if connection.vendor == 'sqlite':
+            # A file, not shared-cache memory, so server threads can write concurrently
+            tmpdir = tempfile.TemporaryDirectory()
+            connection.settings_dict['TEST'] = {
+                **connection.settings_dict.get('TEST', {}),
+                'NAME': os.path.join(tmpdir.name, 'benchmark.sqlite3'),
+            }
+            connection.settings_dict.setdefault('OPTIONS', {}).update(
+                {'timeout': 30, 'transaction_mode': 'IMMEDIATE'}
+            )
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        return old_name, tmpdir
+
+    def run_load(self, clients, flows):
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler, allow_reuse_address=False)
+        server.set_app(QueryCountingHandler(WSGIHandler()))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+        run_id = int(time.time())
+        failures = []
+        workers = [FlowClient(base_url) for _ in range(clients)]
+
+        def drive(index, client):
+            for flow in range(flows):
+                serial = index * flows + flow
+                try:
+                    client.run_flow(f'bench-{run_id}-{serial}@example.com', f'+88018{serial:08d}')
+                except Exception as e:
+                    failures.append(str(e))
+
+        threads = [threading.Thread(target=drive, args=(i, c)) for i, c in enumerate(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+        server.server_close()
+
+        samples = defaultdict(list)
+        for client in workers:
+            for endpoint, rows in client.samples.items():
+                samples[endpoint] += rows
+        return elapsed, samples, failures
+
+    def print_report(self, results):
+        meta = results['meta']
+        self.stdout.write(
+            f"{meta['clients']} clients x {meta['flows_per_client']} flows on {meta['database']} "
+            f"({meta['password_hashers']} hashers): {meta['elapsed_s']} s, "
+            f"{meta['flows_per_s']} flows/s, {meta['requests_per_s']} req/s, {meta['failed_flows']} failed"
+        )
+        self.stdout.write(
+            f"{'endpoint':<14}{'requests':>9}{'errors':>8}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}"
+        )
+        for endpoint, row in results['endpoints'].items():
+            self.stdout.write(
+                f"{endpoint:<14}{row['requests']:>9}{row['errors']:>8}"
+                f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}{row['queries_per_request']:>9}"
+            )
+
+    def print_comparison(self, results, path):
+        with open(path) as f:
+            previous = json.load(f)
+        self.stdout.write(f'\nChange against {path}:')
+        before = previous['meta']
+        changes = [
+            f"{key} {(results['meta'][key] - before[key]) / before[key] * 100:+.1f}%"
+            for key in ('flows_per_s', 'requests_per_s') if before.get(key)
+        ]
+        self.stdout.write(f"{'run':<14}{', '.join(changes)}")
+        for endpoint, row in results['endpoints'].items():
+            before = previous['endpoints'].get(endpoint)
+            if not before:
+                continue
+            changes = []
+            for key in ('p95_ms', 'queries_per_request'):
+                if before[key]:
+                    changes.append(f'{key} {(row[key] - before[key]) / before[key] * 100:+.1f}%')
+            self.stdout.write(f"{endpoint:<14}{', '.join(changes)}")
+
+    def save(self, results, path):
+        if not path:
+            stamp = datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')
+            path = os.path.join(settings.BASE_DIR, 'benchmarks', f'accounts-{stamp}.json')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'\nResults saved to {path}'))
@@ -0,0 +1,94 @@
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# "import time:       123 |        456 |     django.conf"
+LINE_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)\s*$')
+
+# -X importtime only sees import statements, not importlib.import_module(),
+# which is how Django loads the settings module, INSTALLED_APPS, their models
+# and the URLconf. The measured process routes import_module() through an
+# import statement so those modules get their own rows instead of being
+# counted as self time of whatever triggered them.
+MEASURED_SNIPPET = """\
+import importlib
+import sys
+_import_module = importlib.import_module
+def import_module(name, package=None):
+    if name.startswith('.'):
+        return _import_module(name, package)
+    exec('import ' + name, {{}})
+    return sys.modules[name]
+importlib.import_module = import_module
+import {module}
+"""
+
+
+def parse_importtime(output):
+    """Parse ``-X importtime`` output into (module, self_us, cumulative_us, depth) tuples."""
+    entries = []
+    for line in output.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def summarize(entries):
+    """Return (total_us, {top-level package: self_us})."""
+    total = sum(cumulative for _, _, cumulative, depth in entries if depth == 0)
+    by_package = defaultdict(int)
+    for module, self_us, _, _ in entries:
+        by_package[module.split('.')[0]] += self_us
+    return total, dict(by_package)
+
+
+class Command(BaseCommand):
+    help = (
+        'Report the import-time breakdown of a fresh worker (python -X importtime) '
+        'and optionally fail when it exceeds STARTUP_IMPORT_BUDGET_MS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='Dental.wsgi', help='Module a worker imports at boot.')
+        parser.add_argument('--profile', default='production', help='DJANGO_PROFILE for the measured process.')
+        parser.add_argument('--top', type=int, default=15, help='Number of rows to show per table.')
+        parser.add_argument('--budget-ms', type=int, help='Override STARTUP_IMPORT_BUDGET_MS.')
+        parser.add_argument('--check', action='store_true', help='Exit with an error if over budget.')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_PROFILE': options['profile']}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', MEASURED_SNIPPET.format(module=options['module'])],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"Importing {options['module']} failed:\n{result.stderr[-2000:]}")
+
+        entries = parse_importtime(result.stderr)
+        total_us, by_package = summarize(entries)
+        top = options['top']
+
+        self.stdout.write(f"Import time for {options['module']} (DJANGO_PROFILE={options['profile']}): "
+                          f'{total_us / 1000:.1f} ms over {len(entries)} modules')
+        self.stdout.write('\nSelf time by top-level package:')
+        for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {self_us / 1000:8.1f} ms  {package}')
+        self.stdout.write('\nSlowest modules (cumulative):')
+        for module, _, cumulative_us, _ in sorted(entries, key=lambda entry: -entry[2])[:top]:
+            self.stdout.write(f'  {cumulative_us / 1000:8.1f} ms  {module}')
+
+        budget_ms = options['budget_ms'] or settings.STARTUP_IMPORT_BUDGET_MS
+        if total_us / 1000 > budget_ms:
+            message = f'Startup imports take {total_us / 1000:.1f} ms, over the {budget_ms} ms budget.'
+            if options['check']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'\nWithin the {budget_ms} ms budget.'))
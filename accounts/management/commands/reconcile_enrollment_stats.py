@@ -0,0 +1,44 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import CustomUser, EnrollmentStat
+
+logger = logging.getLogger('dashboard')
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the EnrollmentStat summary table from CustomUser.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild.')
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report buckets that drifted from the users table; exit 1 if any did.',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        stored = {
+            (stat.year, stat.educational_institute, stat.is_email_verified): stat.students
+            for stat in EnrollmentStat.objects.using(using).filter(students__gt=0)
+        }
+        actual = EnrollmentStat.objects.count_buckets(CustomUser.objects.using(using))
+        drifted = sorted(
+            (bucket, stored.get(bucket, 0), actual.get(bucket, 0))
+            for bucket in stored.keys() | actual.keys()
+            if stored.get(bucket, 0) != actual.get(bucket, 0)
+        )
+        for (year, institute, verified), was, now in drifted:
+            self.stdout.write(f'{year} {institute or "(not set)"} verified={verified}: {was} -> {now}')
+
+        if options['check']:
+            if drifted:
+                logger.warning('%d enrollment stat buckets drifted', len(drifted))
+                raise CommandError(f'{len(drifted)} buckets drifted.')
+            self.stdout.write(self.style.SUCCESS('Enrollment stats are up to date.'))
+            return
+
+        buckets = EnrollmentStat.objects.rebuild(using)
+        logger.info('Rebuilt %d enrollment stat buckets (%d had drifted)', buckets, len(drifted))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {buckets} buckets ({len(drifted)} had drifted).'))
@@ -0,0 +1,142 @@
+"""
+Serving of files under MEDIA_ROOT once the view has done its permission check.
+
+With MEDIA_SERVE_BACKEND set, the response carries no body: the front-end web
+server is told which file to send and the bytes never pass through Python.
+
+    'x-accel'     nginx ``X-Accel-Redirect`` to MEDIA_ACCEL_REDIRECT_PREFIX + path,
+                  which must be an ``internal`` location aliased to MEDIA_ROOT
+    'x-sendfile'  Apache mod_xsendfile / lighttpd ``X-Sendfile`` with the absolute path,
+                  percent-encoded
+
+Otherwise the file is streamed by Django with FileResponse, honouring
+If-Modified-Since and single byte-range requests.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class FileSlice:
+    """File-like object that reads ``length`` bytes starting at ``start``."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def resolve_media_path(path):
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Invalid media path')
+    if not os.path.isfile(fullpath):
+        raise Http404('Media file does not exist')
+    return path, fullpath
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) for a single byte range. Returns None when the header
+    is absent or not a form we support (multi-range, malformed), in which case
+    it is ignored and the whole file is sent. Raises RangeNotSatisfiable for a
+    single range that parses but lies outside the file.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match:
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None  # syntactically invalid, so ignored
+        end = min(int(last), size - 1) if last else size - 1
+    elif last:  # suffix range: the final N bytes
+        if int(last) == 0:
+            raise RangeNotSatisfiable
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def serve_media(request, path):
+    path, fullpath = resolve_media_path(path)
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+
+    backend = getattr(settings, 'MEDIA_SERVE_BACKEND', '')
+    if backend == 'x-accel':
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+        # Percent-encoded so non-ASCII filenames are not RFC 2047-encoded by Django
+        response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + path)
+    elif backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        # Likewise; mod_xsendfile decodes it again (XSendFileUnescape, on by default)
+        response['X-Sendfile'] = quote(fullpath)
+    else:
+        return stream_media(request, fullpath, content_type, encoding)
+    response['Cache-Control'] = 'private'
+    return response
+
+
+def stream_media(request, fullpath, content_type, encoding=None):
+    statobj = os.stat(fullpath)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), statobj.st_mtime):
+        return HttpResponseNotModified()
+
+    size = statobj.st_size
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(
+            FileSlice(open(fullpath, 'rb'), start, length), status=206, content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(length)
+    else:
+        response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = http_date(statobj.st_mtime)
+    response['Cache-Control'] = 'private'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.3 on 2026-10-19 13:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_customuser_email_lower_uniq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('user_agent', models.CharField(blank=True, max_length=255)),
+                ('outcome', models.CharField(choices=[('success', 'Success'), ('unverified', 'Email not verified'), ('failed', 'Invalid credentials')], max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='login_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Login Event',
+                'verbose_name_plural': 'Login Events',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['created_at'], name='accounts_loginevent_time_idx'), models.Index(fields=['user', 'created_at'], name='accounts_loginevent_user_idx')],
+            },
+        ),
+    ]
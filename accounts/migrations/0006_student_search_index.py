@@ -0,0 +1,64 @@
+from django.db import migrations
+
+try:
+    from django.contrib.postgres.operations import TrigramExtension
+except ImportError:  # no psycopg, so this database cannot be PostgreSQL
+    TrigramExtension = None
+
+# Frozen copy of the index DDL as of this migration; accounts.search may change.
+# DOCUMENT must stay identical to accounts.search.PG_DOCUMENT.
+DOCUMENT = (
+    "(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || "
+    "coalesce(email, '') || ' ' || coalesce(student_id, '') || ' ' || "
+    "coalesce(educational_institute, '') || ' ' || coalesce(current_occupation, ''))"
+)
+
+CREATE = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS accounts_studentsearch USING fts5("
+        "name, email, student_id, educational_institute, current_occupation, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        "INSERT INTO accounts_studentsearch (rowid, name, email, student_id, "
+        "educational_institute, current_occupation) "
+        "SELECT id, first_name || ' ' || last_name, email, coalesce(student_id, ''), "
+        "coalesce(educational_institute, ''), coalesce(current_occupation, '') "
+        "FROM accounts_customuser WHERE role = 'student'",
+    ],
+    'postgresql': [
+        "CREATE INDEX IF NOT EXISTS accounts_user_search_fts ON accounts_customuser "
+        f"USING GIN (to_tsvector('simple', {DOCUMENT})) WHERE role = 'student'",
+        "CREATE INDEX IF NOT EXISTS accounts_user_search_trgm ON accounts_customuser "
+        f"USING GIN ({DOCUMENT} gin_trgm_ops) WHERE role = 'student'",
+    ],
+}
+
+DROP = {
+    'sqlite': ["DROP TABLE IF EXISTS accounts_studentsearch"],
+    'postgresql': [
+        "DROP INDEX IF EXISTS accounts_user_search_fts",
+        "DROP INDEX IF EXISTS accounts_user_search_trgm",
+    ],
+}
+
+
+def create_index(apps, schema_editor):
+    for sql in CREATE.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    for sql in DROP.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_loginevent'),
+    ]
+
+    operations = [
+        # TrigramExtension is a no-op on other databases
+        *([TrigramExtension()] if TrigramExtension else []),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-19 13:22
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import ExtractYear
+
+
+def populate_stats(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    EnrollmentStat = apps.get_model('accounts', 'EnrollmentStat')
+    db = schema_editor.connection.alias
+    rows = (
+        CustomUser.objects.using(db).filter(role='student').order_by()
+        .values_list(ExtractYear('date_joined'), 'educational_institute', 'is_email_verified')
+        .annotate(n=Count('id'))
+    )
+    counts = {}
+    for year, institute, verified, n in rows:
+        key = (year, institute or '', verified)
+        counts[key] = counts.get(key, 0) + n
+    EnrollmentStat.objects.using(db).bulk_create([
+        EnrollmentStat(year=year, educational_institute=institute, is_email_verified=verified, students=n)
+        for (year, institute, verified), n in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_customuser_roster_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnrollmentStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('educational_institute', models.CharField(blank=True, max_length=255)),
+                ('is_email_verified', models.BooleanField()),
+                ('students', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Enrollment Statistic',
+                'verbose_name_plural': 'Enrollment Statistics',
+                'constraints': [models.UniqueConstraint(fields=('year', 'educational_institute', 'is_email_verified'), name='accounts_enrollmentstat_bucket_uniq')],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
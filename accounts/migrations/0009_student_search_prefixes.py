@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# Prefix indexes for every term length from 2 to 10 characters. With only
+# 2 and 3, a broad prefix such as "student"* had to merge the doclists of
+# every matching term (one per email address) before LIMIT could apply.
+CREATE_TABLE = (
+    "CREATE VIRTUAL TABLE accounts_studentsearch USING fts5("
+    "name, email, student_id, educational_institute, current_occupation, "
+    "tokenize='unicode61 remove_diacritics 2', prefix='{prefix}')"
+)
+POPULATE = (
+    "INSERT INTO accounts_studentsearch (rowid, name, email, student_id, "
+    "educational_institute, current_occupation) "
+    "SELECT id, first_name || ' ' || last_name, email, coalesce(student_id, ''), "
+    "coalesce(educational_institute, ''), coalesce(current_occupation, '') "
+    "FROM accounts_customuser WHERE role = 'student'"
+)
+
+
+def recreate_table(prefix):
+    def recreate(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return  # the PostgreSQL expression indexes need no prefix settings
+        schema_editor.execute("DROP TABLE IF EXISTS accounts_studentsearch")
+        schema_editor.execute(CREATE_TABLE.format(prefix=prefix))
+        schema_editor.execute(POPULATE)
+    return recreate
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_enrollmentstat'),
+    ]
+
+    operations = [
+        migrations.RunPython(recreate_table('2 3 4 5 6 7 8 9 10'), recreate_table('2 3')),
+    ]
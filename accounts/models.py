@@ -1,21 +1,46 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from collections import Counter
+from contextlib import nullcontext
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Count, F
+from django.db.models.functions import ExtractYear, Lower
 from django.utils import timezone
 from datetime import timedelta, datetime
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from django.contrib.sessions.models import Session
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .search import update_search_index, remove_from_search_index
 ROLE_CHOICES = (
     ('student', 'Student'),
     ('teacher', 'Teacher'),
     ('admin', 'Admin'),
 )
 
+# Roles that may see other users' data (directory, roster, profile photos)
+STAFF_ROLES = ('teacher', 'admin')
+
+LOGIN_OUTCOME_CHOICES = (
+    ('success', 'Success'),
+    ('unverified', 'Email not verified'),
+    ('failed', 'Invalid credentials'),
+)
+
 GENDER_CHOICES = (
     ('male', 'Male'),
     ('female', 'Female'),
     ('other', 'Other'),
 )
 
+# Fields that decide which EnrollmentStat bucket a user is counted in
+ENROLLMENT_STAT_FIELDS = ('role', 'date_joined', 'educational_institute', 'is_email_verified')
+
+def enrollment_bucket(user):
+    """Return the (year, institute, verified) bucket for a user, or None for non-students."""
+    if user.role != 'student':
+        return None
+    return (user.date_joined.year, user.educational_institute or '', user.is_email_verified)
+
 class CustomUser(AbstractUser):
     student_id = models.CharField(max_length=20, unique=True, blank=True, null=True)
     email = models.EmailField(unique=True)
@@ -45,10 +70,24 @@ class CustomUser(AbstractUser):
     class Meta:
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        constraints = [
+            # Functional index used by accounts.backends.EmailBackend and
+            # RegisterForm; also rejects emails that differ only in case.
+            models.UniqueConstraint(Lower('email'), name='accounts_user_email_lower_uniq'),
+        ]
+        indexes = [
+            # Keyset pagination for the roster API, with and without a role filter
+            models.Index(fields=['date_joined', 'id'], name='accounts_user_joined_idx'),
+            models.Index(fields=['role', 'date_joined', 'id'], name='accounts_user_role_joined_idx'),
+        ]
 
     def __str__(self):
         return f"{self.email} ({self.get_full_name()})"
 
+    def has_staff_role(self):
+        """Teachers, admins and Django staff or superusers."""
+        return self.is_staff or self.is_superuser or self.role in STAFF_ROLES
+
     def generate_student_id(self):
         year = timezone.now().year
         # Try to generate a unique ID with retries
@@ -72,12 +111,75 @@ class CustomUser(AbstractUser):
         sequence = str(timestamp)[-6:].zfill(6)  # Use last 6 digits of timestamp
         return f'DTA-{year}-{sequence}'
 
+    @classmethod
+    def allocate_student_ids(cls, count, using='default'):
+        """
+        Return ``count`` unused student IDs numbered as generate_student_id()
+        would, with one count query and one lookup of taken IDs for the batch.
+        """
+        year = timezone.now().year
+        users = cls._default_manager.using(using)
+        sequence = users.filter(student_id__startswith=f'DTA-{year}', role='student').count() + 1
+        student_ids = []
+        while len(student_ids) < count:
+            candidates = [
+                f'DTA-{year}-{str(n).zfill(6)}'
+                for n in range(sequence, sequence + count - len(student_ids))
+            ]
+            taken = set(users.filter(student_id__in=candidates).values_list('student_id', flat=True))
+            student_ids += [candidate for candidate in candidates if candidate not in taken]
+            sequence += len(candidates)
+        return student_ids
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_bucket()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        if fields is None or set(fields) & set(ENROLLMENT_STAT_FIELDS):
+            self.__dict__.pop('_loaded_bucket', None)
+            self._remember_bucket()
+
+    def _remember_bucket(self):
+        # The bucket as last read from or written to the database, so save()
+        # can skip the stats work when none of its fields changed.
+        if not self.get_deferred_fields() & set(ENROLLMENT_STAT_FIELDS):
+            self._loaded_bucket = enrollment_bucket(self)
+
     def save(self, *args, **kwargs):
         if self.email:  # Check if email exists before lowercasing
             self.email = self.email.lower()
         if self.role == 'student' and not self.student_id:
             self.student_id = self.generate_student_id()
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        track_stats = update_fields is None or bool(set(update_fields) & set(ENROLLMENT_STAT_FIELDS))
+        if track_stats and not self._state.adding and hasattr(self, '_loaded_bucket'):
+            track_stats = enrollment_bucket(self) != self._loaded_bucket
+        # When the bucket did change, the old one is read under a row lock
+        # rather than taken from this instance, which may be stale: concurrent
+        # saves (a double-submitted verify form) then move the user one after
+        # the other instead of twice.
+        lock = track_stats and not self._state.adding
+        using = kwargs.get('using') or router.db_for_write(CustomUser, instance=self)
+        with transaction.atomic(using=using) if lock else nullcontext():
+            old_bucket = None
+            if lock:
+                old = (
+                    CustomUser.objects.using(using).select_for_update()
+                    .only(*ENROLLMENT_STAT_FIELDS).filter(pk=self.pk).first()
+                )
+                old_bucket = old and enrollment_bucket(old)
+            super().save(*args, **kwargs)
+            update_search_index(self, self._state.db, update_fields)
+            if track_stats:
+                EnrollmentStat.objects.move(old_bucket, enrollment_bucket(self), self._state.db)
+        if update_fields is None:
+            self._remember_bucket()
+        elif set(update_fields) & set(ENROLLMENT_STAT_FIELDS):
+            self.__dict__.pop('_loaded_bucket', None)  # other bucket fields may be unsaved
         
     def logout_previous_session(self):
         if self.session_key:
@@ -86,7 +188,12 @@ class CustomUser(AbstractUser):
             except Session.DoesNotExist:
                 pass
             self.session_key = None
-            self.save()
+            self.save(update_fields=['session_key'])
+
+@receiver(post_delete, sender=CustomUser)
+def remove_deleted_user_from_search(sender, instance, using, **kwargs):
+    remove_from_search_index(instance.pk, using)
+    EnrollmentStat.objects.move(enrollment_bucket(instance), None, using)
 
 class EmailOTP(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='otps')
@@ -107,4 +214,115 @@ class EmailOTP(models.Model):
         return timezone.now() <= expiry_time
 
     def __str__(self):
-        return f"OTP for {self.user.email}"
\ No newline at end of file
+        return f"OTP for {self.user.email}"
+
+class LoginEvent(models.Model):
+    """Append-only login history, written in batches by accounts.events."""
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='login_events'
+    )
+    email = models.EmailField()  # as submitted, so failed attempts are kept too
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.CharField(max_length=255, blank=True)
+    outcome = models.CharField(max_length=10, choices=LOGIN_OUTCOME_CHOICES)
+    # Set when the event happens, not when the buffer is flushed
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Login Event'
+        verbose_name_plural = 'Login Events'
+        ordering = ['-created_at']
+        indexes = [
+            # Time-leading indexes keep range scans cheap and map directly onto
+            # range partitioning by created_at if the table outgrows one heap.
+            models.Index(fields=['created_at'], name='accounts_loginevent_time_idx'),
+            models.Index(fields=['user', 'created_at'], name='accounts_loginevent_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.email} {self.outcome} at {self.created_at:%Y-%m-%d %H:%M:%S}"
+
+
+class EnrollmentStatManager(models.Manager):
+    def apply(self, deltas, using='default'):
+        """Add ``{bucket: delta}`` counts to the summary table."""
+        for (year, institute, verified), delta in deltas.items():
+            if not delta:
+                continue
+            bucket = self.db_manager(using).filter(
+                year=year, educational_institute=institute, is_email_verified=verified
+            )
+            if bucket.update(students=F('students') + delta) or delta < 0:
+                continue
+            try:
+                with transaction.atomic(using=using):
+                    self.db_manager(using).create(
+                        year=year, educational_institute=institute,
+                        is_email_verified=verified, students=delta,
+                    )
+            except IntegrityError:  # created concurrently
+                bucket.update(students=F('students') + delta)
+
+    def move(self, old_bucket, new_bucket, using='default'):
+        if old_bucket == new_bucket:
+            return
+        deltas = Counter()
+        if old_bucket:
+            deltas[old_bucket] -= 1
+        if new_bucket:
+            deltas[new_bucket] += 1
+        self.apply(deltas, using)
+
+    def count_buckets(self, users):
+        """Group a CustomUser queryset into ``Counter({bucket: students})``."""
+        rows = (
+            users.filter(role='student').order_by()
+            .values_list(ExtractYear('date_joined'), 'educational_institute', 'is_email_verified')
+            .annotate(n=Count('id'))
+        )
+        counts = Counter()
+        for year, institute, verified, n in rows:
+            counts[(year, institute or '', verified)] += n  # NULL and '' share a bucket
+        return counts
+
+    def rebuild(self, using='default'):
+        """Recompute every bucket from CustomUser; returns the number of buckets."""
+        counts = self.count_buckets(CustomUser.objects.using(using))
+        with transaction.atomic(using=using):
+            self.db_manager(using).all().delete()
+            self.db_manager(using).bulk_create([
+                self.model(year=year, educational_institute=institute,
+                           is_email_verified=verified, students=n)
+                for (year, institute, verified), n in counts.items()
+            ])
+        return len(counts)
+
+
+class EnrollmentStat(models.Model):
+    """
+    Student counts per (registration year, institute, verified) bucket, kept
+    up to date by CustomUser.save() so the dashboard never scans users.
+    Queryset updates and raw SQL bypass save(), so callers adjust the counts
+    themselves (see accounts.admin.update_in_chunks); reconcile_enrollment_stats
+    repairs anything that slips through.
+    """
+    year = models.PositiveSmallIntegerField()
+    educational_institute = models.CharField(max_length=255, blank=True)
+    is_email_verified = models.BooleanField()
+    students = models.IntegerField(default=0)
+
+    objects = EnrollmentStatManager()
+
+    class Meta:
+        verbose_name = 'Enrollment Statistic'
+        verbose_name_plural = 'Enrollment Statistics'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['year', 'educational_institute', 'is_email_verified'],
+                name='accounts_enrollmentstat_bucket_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        verified = 'verified' if self.is_email_verified else 'unverified'
+        return f"{self.year} {self.educational_institute or '(none)'} {verified}: {self.students}"
@@ -0,0 +1,142 @@
+"""
+Full-text index over the student directory.
+
+SQLite keeps an FTS5 table (``accounts_studentsearch``, rowid = user id) that
+CustomUser.save() updates one row at a time. PostgreSQL uses GIN expression
+indexes (tsvector + pg_trgm) over the same columns, which the database keeps
+in sync by itself. Other backends fall back to ``icontains`` lookups.
+"""
+from django.db import connections
+
+FTS_TABLE = 'accounts_studentsearch'
+
+# Fields a change to which requires re-indexing the user
+INDEXED_FIELDS = (
+    'first_name', 'last_name', 'email', 'student_id',
+    'educational_institute', 'current_occupation', 'role',
+)
+
+# Must stay byte-for-byte identical to the expression used by the PostgreSQL
+# indexes in migration 0006 (DOCUMENT there), or the planner will not use them.
+PG_DOCUMENT = (
+    "(coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || "
+    "coalesce(email, '') || ' ' || coalesce(student_id, '') || ' ' || "
+    "coalesce(educational_institute, '') || ' ' || coalesce(current_occupation, ''))"
+)
+
+# Shorter terms match whole words only: a one-character prefix matches most
+# of the index, and FTS5 has prefix indexes (migration 0009) for 2-10 characters.
+MIN_PREFIX_LENGTH = 2
+
+_SELECT_STUDENTS = (
+    "SELECT id, first_name || ' ' || last_name, email, coalesce(student_id, ''), "
+    "coalesce(educational_institute, ''), coalesce(current_occupation, '') "
+    "FROM accounts_customuser WHERE role = 'student'"
+)
+
+
+def _row(user):
+    return (
+        user.pk, f'{user.first_name} {user.last_name}', user.email, user.student_id or '',
+        user.educational_institute or '', user.current_occupation or '',
+    )
+
+
+def update_search_index(user, using='default', update_fields=None):
+    """Re-index a single user after save (SQLite only; PostgreSQL is automatic)."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    if update_fields is not None and not set(update_fields) & set(INDEXED_FIELDS):
+        return
+    with connection.cursor() as cursor:
+        if user.role == 'student':
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, name, email, student_id, '
+                'educational_institute, current_occupation) VALUES (%s, %s, %s, %s, %s, %s)',
+                _row(user),
+            )
+        else:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [user.pk])
+
+
+def remove_from_search_index(user_id, using='default'):
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [user_id])
+
+
+def reindex_users(user_ids, using='default'):
+    """Re-index a batch of users after a queryset.update() that bypassed save()."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not user_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', list(user_ids))
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, email, student_id, '
+            'educational_institute, current_occupation) '
+            f'{_SELECT_STUDENTS} AND id IN ({placeholders})',
+            list(user_ids),
+        )
+
+
+def rebuild_search_index(using='default'):
+    """Repopulate the SQLite FTS table from scratch, e.g. after bulk imports."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, email, student_id, '
+            f'educational_institute, current_occupation) {_SELECT_STUDENTS}'
+        )
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _terms(query):
+    return [term for term in query.split() if term]
+
+
+def search_student_ids(query, limit=20, using='default'):
+    """
+    Return ids of students matching every term of ``query`` (prefix match for
+    terms of MIN_PREFIX_LENGTH or more characters), newest first. Ranking is
+    deliberately skipped: scoring every hit of a broad term is what makes large
+    directories slow, while rowid order lets the index stop at ``limit``. Returns None when the backend has no full-text index.
+    """
+    terms = _terms(query)
+    if not terms:
+        return []
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            match = ' '.join(
+                ('"%s"*' if len(term) >= MIN_PREFIX_LENGTH else '"%s"') % term.replace('"', '""')
+                for term in terms
+            )
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rowid DESC LIMIT %s',
+                [match, limit],
+            )
+        elif connection.vendor == 'postgresql':
+            tsquery = ' & '.join(
+                ("'%s':*" if len(term) >= MIN_PREFIX_LENGTH else "'%s'")
+                % term.replace('\\', '').replace("'", "''")
+                for term in terms
+            )
+            cursor.execute(
+                "SELECT id FROM accounts_customuser WHERE role = 'student' AND ("
+                f"to_tsvector('simple', {PG_DOCUMENT}) @@ to_tsquery('simple', %s) "
+                f"OR {PG_DOCUMENT} ILIKE %s) ORDER BY id DESC LIMIT %s",
+                [tsquery, '%' + _escape_like(query.strip()) + '%', limit],
+            )
+        else:
+            return None
+        return [row[0] for row in cursor.fetchall()]
@@ -1,3 +1,682 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import smtplib
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from io import StringIO
+from unittest import mock
+from urllib.parse import quote
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.mail.backends import locmem
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from .events import LoginEventBuffer, login_events
+from .forms import RegisterForm
+from .models import CustomUser, EmailOTP, EnrollmentStat, LoginEvent
+from .search import rebuild_search_index, search_student_ids
+from .management.commands import benchmark_accounts
+from .management.commands.importtime import parse_importtime, summarize
+from .utils import deliver_otp_emails
+from .views import RosterExportView, RosterMixin
+
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+# Flush inline so tests never start the background writer thread
+INLINE_LOGIN_EVENTS = {'BATCH_SIZE': 500, 'FLUSH_INTERVAL_MS': 60000, 'BACKGROUND': False}
+
+
+def make_user(email='alice@example.com', phone_number='+8801700000001', **extra):
+    extra = {'first_name': 'Alice', 'last_name': 'Smith', 'is_email_verified': True, **extra}
+    user = CustomUser(email=email, username=email, phone_number=phone_number, **extra)
+    user.set_password('s3cret-pass!')
+    user.save()
+    return user
+
+
+def stat_counts():
+    return {
+        (stat.year, stat.educational_institute, stat.is_email_verified): stat.students
+        for stat in EnrollmentStat.objects.filter(students__gt=0)
+    }
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class RegisterValidationTests(TestCase):
+    def form_data(self, **overrides):
+        data = {
+            'first_name': 'Bob', 'last_name': 'Jones', 'email': 'Bob@Example.com',
+            'phone_number': '+8801700000002',
+            'password1': 'Long-enough-pass-42', 'password2': 'Long-enough-pass-42',
+        }
+        data.update(overrides)
+        return data
+
+    def test_unique_fields_checked_in_one_query(self):
+        make_user()
+        form = RegisterForm(self.form_data(email='ALICE@example.com', phone_number='+8801700000001'))
+        with self.assertNumQueries(1):
+            self.assertFalse(form.is_valid())
+        self.assertIn('email', form.errors)
+        self.assertIn('phone_number', form.errors)
+
+    def test_valid_form_uses_one_query(self):
+        form = RegisterForm(self.form_data())
+        with self.assertNumQueries(1):
+            self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data['email'], 'bob@example.com')
+
+    def test_register_view_query_count(self):
+        # validate (1), student_id (2), insert user (1), search index (1),
+        # stats bucket (UPDATE misses, so savepoint + INSERT + release: 4), insert OTP (1)
+        with self.assertNumQueries(10):
+            response = self.client.post(reverse('register'), self.form_data())
+        self.assertEqual(response.status_code, 302)
+
+    def test_email_unique_ignores_case_at_database_level(self):
+        make_user()
+        with self.assertRaises(IntegrityError):
+            CustomUser.objects.bulk_create([
+                CustomUser(email='Alice@Example.com', username='other', phone_number='+8801700000009')
+            ])
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, LOGIN_EVENTS=INLINE_LOGIN_EVENTS)
+class EmailBackendTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def test_authenticate_is_one_query_and_case_insensitive(self):
+        with self.assertNumQueries(1):
+            user = authenticate(email='  ALICE@example.COM', password='s3cret-pass!')
+        self.assertEqual(user, self.user)
+
+    def test_authenticate_accepts_username_keyword(self):
+        self.assertEqual(authenticate(username='alice@example.com', password='s3cret-pass!'), self.user)
+
+    def test_wrong_password_or_unknown_email(self):
+        self.assertIsNone(authenticate(email='alice@example.com', password='nope'))
+        with self.assertNumQueries(1):
+            self.assertIsNone(authenticate(email='nobody@example.com', password='nope'))
+
+    def test_login_view_query_count(self):
+        with self.assertNumQueries(10):
+            response = self.client.post(
+                reverse('login'), {'email': 'Alice@Example.com', 'password': 's3cret-pass!'}
+            )
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+        login_events.flush()
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, LOGIN_EVENTS=INLINE_LOGIN_EVENTS)
+class LoginEventTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+        self.addCleanup(login_events.flush)
+
+    def event(self, **extra):
+        return LoginEvent(user=self.user, email=self.user.email, outcome='success', **extra)
+
+    def test_login_outcomes_are_buffered_until_flush(self):
+        self.client.post(reverse('login'), {'email': 'alice@example.com', 'password': 's3cret-pass!'},
+                         HTTP_USER_AGENT='pytest', HTTP_X_FORWARDED_FOR='10.0.0.7, 10.0.0.1')
+        self.client.post(reverse('login'), {'email': 'alice@example.com', 'password': 'wrong'})
+        self.assertFalse(LoginEvent.objects.exists())
+        with self.assertNumQueries(1):  # one multi-row INSERT
+            self.assertEqual(login_events.flush(), 2)
+        success, failed = LoginEvent.objects.order_by('created_at')
+        self.assertEqual((success.outcome, success.user, success.ip_address, success.user_agent),
+                         ('success', self.user, '10.0.0.7', 'pytest'))
+        self.assertEqual((failed.outcome, failed.user), ('failed', None))
+
+    @override_settings(LOGIN_EVENTS={**INLINE_LOGIN_EVENTS, 'BATCH_SIZE': 3})
+    def test_flushes_when_batch_is_full(self):
+        buffer = LoginEventBuffer()
+        buffer.add(self.event())
+        buffer.add(self.event())
+        self.assertEqual(LoginEvent.objects.count(), 0)
+        buffer.add(self.event())
+        self.assertEqual(LoginEvent.objects.count(), 3)
+
+    @override_settings(LOGIN_EVENTS={**INLINE_LOGIN_EVENTS, 'FLUSH_INTERVAL_MS': 0})
+    def test_flushes_when_interval_elapsed(self):
+        LoginEventBuffer().add(self.event())
+        self.assertEqual(LoginEvent.objects.count(), 1)
+
+    def test_overlong_email_is_truncated_to_fit(self):
+        email = 'a' * 300 + '@example.com'
+        self.client.post(reverse('login'), {'email': email, 'password': 'wrong'})
+        login_events.flush()
+        self.assertEqual(LoginEvent.objects.get().email, email[:254])
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, 'timed out waiting for the flusher thread')
+            time.sleep(0.01)
+
+    def background_buffer(self, written):
+        """A BACKGROUND buffer whose writes land in ``written`` instead of the database."""
+        self.enterContext(mock.patch.object(
+            LoginEvent.objects, 'bulk_create', side_effect=lambda events, **kwargs: written.extend(events)
+        ))
+        self.register_exit_hook = self.enterContext(mock.patch('accounts.events.atexit.register'))
+        buffer = LoginEventBuffer()
+        self.addCleanup(buffer.stop)
+        return buffer
+
+    @override_settings(LOGIN_EVENTS={'BATCH_SIZE': 500, 'FLUSH_INTERVAL_MS': 20, 'BACKGROUND': True})
+    def test_background_thread_flushes_on_interval(self):
+        written = []
+        buffer = self.background_buffer(written)
+        buffer.add(self.event())
+        self.assertTrue(buffer._thread.is_alive())
+        self.wait_for(lambda: len(written) == 1)
+
+    @override_settings(LOGIN_EVENTS={'BATCH_SIZE': 3, 'FLUSH_INTERVAL_MS': 60000, 'BACKGROUND': True})
+    def test_background_thread_wakes_when_batch_is_full(self):
+        written = []
+        buffer = self.background_buffer(written)
+        buffer.add(self.event())
+        buffer.add(self.event())
+        time.sleep(0.05)
+        self.assertEqual(written, [])
+        buffer.add(self.event())
+        self.wait_for(lambda: len(written) == 3)
+
+    @override_settings(LOGIN_EVENTS={'BATCH_SIZE': 500, 'FLUSH_INTERVAL_MS': 60000, 'BACKGROUND': True})
+    def test_exit_hook_stops_thread_and_drains(self):
+        written = []
+        buffer = self.background_buffer(written)
+        buffer.add(self.event())
+        buffer.add(self.event())
+        self.register_exit_hook.assert_called_once_with(buffer.stop)
+        self.register_exit_hook.call_args.args[0]()
+        self.assertFalse(buffer._thread.is_alive())
+        self.assertEqual(len(written), 2)
+
+    def test_throughput(self):
+        buffer = LoginEventBuffer()
+        count = 10000
+        started = time.perf_counter()
+        for _ in range(count):
+            buffer.add(self.event())
+        buffer.flush()
+        elapsed = time.perf_counter() - started
+        self.assertEqual(LoginEvent.objects.count(), count)
+        self.assertGreater(count / elapsed, 2000, f'{count / elapsed:.0f} events/sec')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, MEDIA_SERVE_BACKEND='')
+class ProtectedMediaTests(TestCase):
+    photo_size = 1024 * 1024
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        os.makedirs(os.path.join(media_root, 'profile_photos'))
+        with open(os.path.join(media_root, 'profile_photos', 'alice.jpg'), 'wb') as f:
+            f.write(bytes(range(256)) * (self.photo_size // 256))
+        self.owner = make_user(profile_photo='profile_photos/alice.jpg')
+        self.url = reverse('protected_media', args=['profile_photos/alice.jpg'])
+
+    def test_requires_login(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_only_owner_or_staff_roles_see_photos(self):
+        self.client.force_login(make_user('eve@example.com', '+8801700000003'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(make_user('tom@example.com', '+8801700000004', role='teacher'))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.force_login(make_user('sam@example.com', '+8801700000007', is_staff=True))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_rejects_path_traversal(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('protected_media', args=['../../etc/passwd']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_fallback_streams_ranges_and_honours_if_modified_since(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(len(b''.join(response.streaming_content)), self.photo_size)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{self.photo_size}')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={self.photo_size}-')
+        self.assertEqual(response.status_code, 416)
+
+        # Multi-range and malformed headers are ignored rather than refused
+        for header in ('bytes=0-1,4-5', 'bytes=5-2', 'items=0-1'):
+            response = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 200, header)
+            self.assertEqual(len(b''.join(response.streaming_content)), self.photo_size)
+
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_header_offload(self):
+        self.client.force_login(self.owner)
+        with self.settings(MEDIA_SERVE_BACKEND='x-accel'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/profile_photos/alice.jpg')
+        self.assertEqual(response.content, b'')
+        with self.settings(MEDIA_SERVE_BACKEND='x-sendfile'):
+            response = self.client.get(self.url)
+        self.assertTrue(response['X-Sendfile'].endswith(os.path.join('profile_photos', 'alice.jpg')))
+
+    def test_offload_percent_encodes_non_ascii_names(self):
+        with open(os.path.join(settings.MEDIA_ROOT, 'profile_photos', 'আলিস ছবি.jpg'), 'wb') as f:
+            f.write(b'photo')
+        self.client.force_login(make_user('tom@example.com', '+8801700000004', role='teacher'))
+        with self.settings(MEDIA_SERVE_BACKEND='x-accel'):
+            response = self.client.get(reverse('protected_media', args=['profile_photos/আলিস ছবি.jpg']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/profile_photos/' + quote('আলিস ছবি.jpg'),
+        )
+        with self.settings(MEDIA_SERVE_BACKEND='x-sendfile'):
+            response = self.client.get(reverse('protected_media', args=['profile_photos/আলিস ছবি.jpg']))
+        self.assertEqual(
+            response['X-Sendfile'],
+            quote(os.path.join(settings.MEDIA_ROOT, 'profile_photos', 'আলিস ছবি.jpg')),
+        )
+
+    def test_offload_throughput_beats_streaming(self):
+        """Stand-in for nginx: the offloaded response is what a worker would send."""
+        self.client.force_login(self.owner)
+
+        def requests_per_second(backend, count=30):
+            with self.settings(MEDIA_SERVE_BACKEND=backend):
+                started = time.perf_counter()
+                for _ in range(count):
+                    response = self.client.get(self.url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                return count / (time.perf_counter() - started)
+
+        streamed = requests_per_second('')
+        offloaded = requests_per_second('x-accel')
+        self.assertGreater(offloaded, streamed, f'{offloaded:.0f} vs {streamed:.0f} req/s')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class StudentDirectoryTests(TestCase):
+    def setUp(self):
+        self.alice = make_user(educational_institute='Dhaka Dental College')
+        self.bob = make_user('bob@example.com', '+8801700000005', first_name='Bob',
+                             current_occupation='Dental nurse')
+        self.teacher = make_user('tom@example.com', '+8801700000004', role='teacher')
+        self.url = reverse('student_search')
+
+    def test_only_teachers_and_admins(self):
+        self.assertEqual(self.client.get(self.url, {'q': 'dental'}).status_code, 302)
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(self.url, {'q': 'dental'}).status_code, 403)
+        # same rule as protected media: Django staff count as staff roles
+        self.client.force_login(make_user('sam@example.com', '+8801700000007', is_staff=True))
+        self.assertEqual(self.client.get(self.url, {'q': 'dental'}).status_code, 200)
+
+    def test_prefix_search_over_indexed_columns(self):
+        self.client.force_login(self.teacher)
+        emails = lambda q: {r['email'] for r in self.client.get(self.url, {'q': q}).json()['results']}
+        self.assertEqual(emails('dent'), {'alice@example.com', 'bob@example.com'})
+        self.assertEqual(emails('dhaka dent'), {'alice@example.com'})
+        self.assertEqual(emails(self.alice.student_id), {'alice@example.com'})
+        self.assertEqual(emails('tom'), set())  # teachers are not in the directory
+
+    def test_index_follows_saves_and_deletes(self):
+        self.alice.educational_institute = 'Chittagong Medical College'
+        self.alice.save()
+        self.assertEqual(search_student_ids('dhaka'), [])
+        self.assertEqual(search_student_ids('chittagong'), [self.alice.pk])
+        self.bob.delete()
+        self.assertEqual(search_student_ids('nurse'), [])
+
+    @unittest.skipUnless(os.getenv('RUN_BENCHMARKS'), 'set RUN_BENCHMARKS=1 to run')
+    def test_search_latency_at_100k_users(self):
+        CustomUser.objects.bulk_create([
+            CustomUser(
+                email=f'student{i}@example.com', username=f'student{i}', password='!',
+                phone_number=f'+88019{i:08d}', first_name=f'First{i}', last_name=f'Last{i % 997}',
+                student_id=f'DTA-2025-{i:06d}', educational_institute=f'Institute {i % 50}',
+                current_occupation='Student',
+            ) for i in range(100000)
+        ], batch_size=5000)
+        rebuild_search_index()
+        queries = [
+            'last42', 'DTA-2025-0999', 'institute 7 last1', 'student123@example', 'first9999',
+            'student', 'example',  # broad terms matching every row
+        ]
+        timings = []
+        for _ in range(20):
+            for q in queries:
+                started = time.perf_counter()
+                list(CustomUser.objects.filter(pk__in=search_student_ids(q)).values('email'))
+                timings.append(time.perf_counter() - started)
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95)] * 1000
+        self.assertLess(p95, 10, f'p95 {p95:.2f}ms')
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class RosterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = make_user('tom@example.com', '+8801700000004', role='teacher')
+        joined = timezone.now()
+        CustomUser.objects.bulk_create([
+            CustomUser(
+                email=f'student{i}@example.com', username=f'student{i}', password='!',
+                phone_number=f'+88019{i:08d}', student_id=f'DTA-{2024 + i % 2}-{i:06d}',
+                is_email_verified=i % 3 == 0,
+                # pairs share a timestamp so the id tie-breaker is exercised
+                date_joined=joined + timezone.timedelta(seconds=i // 2),
+            ) for i in range(25)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def test_walks_every_page_without_count_queries(self):
+        emails, cursor = [], None
+        while True:
+            params = {'role': 'student', 'page_size': 4, **({'cursor': cursor} if cursor else {})}
+            with self.assertNumQueries(3):  # session, user, page
+                data = self.client.get(reverse('roster'), params).json()
+            emails += [row['email'] for row in data['results']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(emails, [f'student{i}@example.com' for i in range(25)])
+
+    @unittest.skipUnless(connection.vendor == 'sqlite', 'checks the SQLite query plan')
+    def test_cursor_seeks_into_the_index(self):
+        row = CustomUser.objects.order_by('date_joined', 'id').values('date_joined', 'id')[10]
+        for params, index in (({'role': 'student'}, 'accounts_user_role_joined_idx'),
+                              ({}, 'accounts_user_joined_idx')):
+            queryset = RosterMixin.after(
+                RosterMixin().filtered_queryset(params), row['date_joined'], row['id']
+            )
+            plan = queryset.explain()
+            self.assertIn(f'SEARCH accounts_customuser USING INDEX {index}', plan)
+            self.assertIn('date_joined>', plan)
+
+    def test_filters(self):
+        data = self.client.get(reverse('roster'), {'year': '2025', 'verified': 'true'}).json()
+        self.assertEqual(
+            [row['student_id'] for row in data['results']],
+            [f'DTA-2025-{i:06d}' for i in range(25) if i % 2 and i % 3 == 0],
+        )
+        self.assertEqual(self.client.get(reverse('roster'), {'role': 'janitor'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('roster'), {'cursor': 'garbage'}).status_code, 400)
+
+    @mock.patch.object(RosterExportView, 'batch_size', 10)
+    def test_streamed_export_batches_with_keyset(self):
+        response = self.client.get(reverse('roster_export'), {'role': 'student'})
+        self.assertTrue(response.streaming)
+        with self.assertNumQueries(3):  # 10 + 10 + 5 rows
+            rows = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows[-1]['email'], 'student24@example.com')
+
+    def test_students_cannot_read_roster(self):
+        self.client.force_login(make_user())
+        self.assertEqual(self.client.get(reverse('roster')).status_code, 403)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AdminBulkActionTests(TestCase):
+    user_count = 10000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('root@example.com', '+8801700000006', is_staff=True, is_superuser=True)
+        CustomUser.objects.bulk_create([
+            CustomUser(
+                email=f'student{i}@example.com', username=f'student{i}', password='!',
+                phone_number=f'+88019{i:08d}', student_id=f'DTA-2025-{i:06d}',
+            ) for i in range(cls.user_count)
+        ], batch_size=2000)
+        rebuild_search_index()
+        EnrollmentStat.objects.rebuild()
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def run_action(self, action):
+        """POST the action with every user selected; return (queries, seconds)."""
+        data = {'action': action, 'select_across': '1', '_selected_action': ['1'], 'index': '0'}
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('admin:accounts_customuser_changelist'), data)
+        elapsed = time.perf_counter() - started
+        self.assertEqual(response.status_code, 302)
+        return len(queries), elapsed
+
+    def test_mark_verified_uses_chunked_updates(self):
+        query_count, elapsed = self.run_action('mark_email_verified')
+        self.assertFalse(CustomUser.objects.filter(is_email_verified=False).exists())
+        self.assertEqual(stat_counts(), {(timezone.now().year, '', True): self.user_count + 1})
+        # admin/session queries plus, per 1000 users, one UPDATE and two
+        # grouped stats reads with their bucket adjustments
+        self.assertLess(query_count, 80)
+        self.assertLess(elapsed, 5)
+
+    def test_change_role_keeps_search_index_in_sync(self):
+        self.assertEqual(len(search_student_ids('student42@example')), 1)
+        query_count, elapsed = self.run_action('make_teachers')
+        self.assertEqual(CustomUser.objects.filter(role='teacher').count(), self.user_count + 1)
+        self.assertEqual(search_student_ids('student42@example'), [])
+        self.assertEqual(stat_counts(), {})
+        self.assertLess(query_count, 120)
+        self.assertLess(elapsed, 5)
+
+    def test_make_students_assigns_ids_per_chunk(self):
+        year = timezone.now().year
+        CustomUser.objects.update(role='teacher', student_id=None)
+        # an ID kept from an earlier spell as a student must be skipped
+        CustomUser.objects.filter(email='student0@example.com').update(student_id=f'DTA-{year}-000002')
+        rebuild_search_index()
+        EnrollmentStat.objects.rebuild()
+
+        query_count, elapsed = self.run_action('make_students')
+        student_ids = list(CustomUser.objects.values_list('student_id', flat=True))
+        self.assertEqual(len(set(student_ids)), self.user_count + 1)
+        self.assertTrue(all(student_id.startswith(f'DTA-{year}-') for student_id in student_ids))
+        self.assertEqual(len(search_student_ids('student42@example')), 1)
+        self.assertEqual(stat_counts(), {(year, '', False): self.user_count, (year, '', True): 1})
+        # per 1000 users: the role UPDATE with its stats reads, then one
+        # SELECT, count, taken-ID lookup and UPDATE for the IDs, plus reindexing
+        self.assertLess(query_count, 150)
+        self.assertLess(elapsed, 5)
+
+    def wait_for_otp_sender(self):
+        for thread in threading.enumerate():
+            if thread.name == 'otp-email-sender':
+                thread.join()
+
+    def test_resend_verification_queues_emails_after_commit(self):
+        with mock.patch('accounts.utils.get_connection', wraps=get_connection) as connect:
+            with self.captureOnCommitCallbacks(execute=True):
+                query_count, elapsed = self.run_action('resend_verification')
+                self.assertEqual(mail.outbox, [])  # nothing is sent inside the request
+            self.wait_for_otp_sender()
+        self.assertEqual(EmailOTP.objects.count(), self.user_count)
+        self.assertEqual(len(mail.outbox), self.user_count)
+        connect.assert_called_once()
+        # one SELECT, then the OTP INSERTs (batches of 249 on SQLite, which
+        # caps bulk_create at 999 parameters per statement)
+        self.assertLess(query_count, 80)
+        self.assertLess(elapsed, 5)
+
+    def test_otp_delivery_survives_smtp_failures(self):
+        otps = [EmailOTP(user=user, code='123456') for user in CustomUser.objects.all()[:5]]
+        send_messages = locmem.EmailBackend.send_messages
+        batches = []
+
+        def flaky_send_messages(backend, messages):
+            batches.append(len(messages))
+            if len(batches) == 2:
+                raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+            return send_messages(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', flaky_send_messages), \
+                self.assertLogs('customauth', 'ERROR'):
+            self.assertEqual(deliver_otp_emails(otps, batch_size=2), (3, 2))
+        self.assertEqual(batches, [2, 2, 1])
+        self.assertEqual(len(mail.outbox), 3)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class EnrollmentStatTests(TestCase):
+    def setUp(self):
+        self.year = timezone.now().year
+
+    def test_saves_move_users_between_buckets(self):
+        alice = make_user(is_email_verified=False, educational_institute='Dhaka Dental College')
+        make_user('bob@example.com', '+8801700000005', is_email_verified=False)
+        make_user('tom@example.com', '+8801700000004', role='teacher')
+        self.assertEqual(stat_counts(), {
+            (self.year, 'Dhaka Dental College', False): 1, (self.year, '', False): 1,
+        })
+
+        alice = CustomUser.objects.get(pk=alice.pk)
+        alice.is_email_verified = True
+        alice.save()
+        self.assertEqual(stat_counts(), {
+            (self.year, 'Dhaka Dental College', True): 1, (self.year, '', False): 1,
+        })
+
+        # partially loaded instance, as returned by the login backend
+        partial = CustomUser.objects.only('id', 'email', 'role', 'student_id').get(pk=alice.pk)
+        partial.educational_institute = 'Other'
+        partial.save(update_fields=['educational_institute'])
+        self.assertEqual(stat_counts(), {(self.year, 'Other', True): 1, (self.year, '', False): 1})
+        CustomUser.objects.get(pk=alice.pk).delete()
+        self.assertEqual(stat_counts(), {(self.year, '', False): 1})
+
+    def test_stale_instances_move_user_once(self):
+        bob = make_user('bob@example.com', '+8801700000005', is_email_verified=False)
+        # a double-submitted verify form: both requests loaded the unverified row
+        first, second = CustomUser.objects.get(pk=bob.pk), CustomUser.objects.get(pk=bob.pk)
+        for user in (first, second):
+            user.is_email_verified = True
+            user.save()
+        self.assertEqual(stat_counts(), {(self.year, '', True): 1})
+
+        bob.refresh_from_db()
+        bob.is_email_verified = False
+        bob.save(update_fields=['is_email_verified'])
+        self.assertEqual(stat_counts(), {(self.year, '', False): 1})
+
+    def test_saves_that_keep_the_bucket_skip_the_locked_read(self):
+        alice = CustomUser.objects.get(pk=make_user().pk)
+        alice.first_name = 'Alicia'
+        with self.assertNumQueries(2):  # UPDATE, search index
+            alice.save()
+        alice.is_email_verified = True  # verifying again
+        with self.assertNumQueries(1):
+            alice.save(update_fields=['is_email_verified'])
+        self.assertEqual(stat_counts(), {(self.year, '', True): 1})
+
+    def test_dashboard_cost_does_not_depend_on_user_count(self):
+        admin_user = make_user('root@example.com', '+8801700000006', is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        url = reverse('admin:accounts_enrollmentstat_changelist')
+        with CaptureQueriesContext(connection) as small:
+            self.assertContains(self.client.get(url), 'Registrations per year')
+        for i in range(30):
+            make_user(f'student{i}@example.com', f'+88019{i:08d}')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(response.context['overall']['total'], 31)
+        # no ChangeList: nothing counts or pages through EnrollmentStat rows
+        self.assertFalse([q for q in large.captured_queries if 'COUNT(' in q['sql']])
+
+    def test_reconcile_command_repairs_drift(self):
+        make_user()
+        EnrollmentStat.objects.update(students=7)
+        with self.assertRaises(CommandError):
+            call_command('reconcile_enrollment_stats', '--check', stdout=open(os.devnull, 'w'))
+        call_command('reconcile_enrollment_stats', stdout=open(os.devnull, 'w'))
+        self.assertEqual(stat_counts(), {(self.year, '', True): 1})
+        call_command('reconcile_enrollment_stats', '--check', stdout=open(os.devnull, 'w'))
+
+
+class ImportTimeTests(TestCase):
+    sample = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       300 |        300 |   _io\n'
+        'import time:       200 |        200 |     django.utils\n'
+        'import time:       100 |        500 |   django.conf\n'
+        'import time:        50 |        550 | Dental.wsgi\n'
+    )
+
+    def test_parse_and_summarize(self):
+        entries = parse_importtime(self.sample)
+        self.assertEqual(entries[1], ('django.utils', 200, 200, 2))
+        self.assertEqual(entries[3], ('Dental.wsgi', 50, 550, 0))
+        total, by_package = summarize(entries)
+        self.assertEqual(total, 550)
+        self.assertEqual(by_package, {'_io': 300, 'django': 300, 'Dental': 50})
+
+    def test_modules_loaded_by_django_get_their_own_rows(self):
+        out = StringIO()
+        call_command('importtime', '--top', '1000', stdout=out)
+        for module in ('Dental.settings', 'accounts.models', 'Dental.urls'):
+            self.assertIn(f'  {module}\n', out.getvalue())
+
+    def test_check_fails_over_budget(self):
+        with self.assertRaisesMessage(CommandError, 'over the 1 ms budget'):
+            call_command('importtime', '--budget-ms', '1', '--check', stdout=open(os.devnull, 'w'))
+
+
+class BenchmarkAccountsTests(TestCase):
+    def test_percentile_and_summary(self):
+        self.assertEqual(benchmark_accounts.percentile(list(range(1, 101)), 95), 95)
+        self.assertEqual(benchmark_accounts.percentile([3.0], 99), 3.0)
+        report = benchmark_accounts.summarize({'login': [(0.010, 8, True), (0.030, 8, False)]})
+        self.assertEqual(report['login'], {
+            'requests': 2, 'errors': 1,
+            'p50_ms': 10.0, 'p95_ms': 30.0, 'p99_ms': 30.0, 'queries_per_request': 8.0,
+        })
+
+    @unittest.skipUnless(os.getenv('RUN_BENCHMARKS'), 'set RUN_BENCHMARKS=1 to run')
+    def test_end_to_end_run_saves_results(self):
+        # Separate process: the command creates and destroys its own test database
+        output = os.path.join(tempfile.mkdtemp(), 'results.json')
+        subprocess.run(
+            [sys.executable, 'manage.py', 'benchmark_accounts', '--clients', '2', '--flows', '2',
+             '--fast-hashers', '--output', output],
+            check=True, capture_output=True,
+        )
+        with open(output) as f:
+            results = json.load(f)
+        self.assertEqual(
+            set(results['endpoints']), {'register_form', 'register', 'verify', 'login', 'profile', 'logout'}
+        )
+        self.assertEqual(results['endpoints']['login']['requests'], 4)
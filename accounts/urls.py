@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import RegisterView, VerifyEmailView, LoginView, LogoutView, ForgotPasswordView, ResetPasswordView, ProfileUpdateView
+from .views import RegisterView, VerifyEmailView, LoginView, LogoutView, ForgotPasswordView, ResetPasswordView, ProfileUpdateView, StudentDirectoryView, RosterView, RosterExportView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
@@ -9,4 +9,7 @@ urlpatterns = [
     path('forgot-password/', ForgotPasswordView.as_view(), name='forgot_password'),
     path('reset-password/<int:user_id>/', ResetPasswordView.as_view(), name='reset_password'),
     path('profile/', ProfileUpdateView.as_view(), name='profile'),
+    path('students/search/', StudentDirectoryView.as_view(), name='student_search'),
+    path('students/roster/', RosterView.as_view(), name='roster'),
+    path('students/roster/export/', RosterExportView.as_view(), name='roster_export'),
 ]
\ No newline at end of file
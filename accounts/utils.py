@@ -1,13 +1,18 @@
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
+import logging
 import random
+import threading
 from .models import EmailOTP
 
-def send_otp_email(user):
-    code = str(random.randint(100000, 999999))
-    EmailOTP.objects.create(user=user, code=code)
-    
+logger = logging.getLogger('customauth')
+
+def generate_otp_code():
+    return str(random.randint(100000, 999999))
+
+def build_otp_email(user, code):
     # Prepare HTML content
     html_message = render_to_string(
         'email/otp_email.html',
@@ -21,19 +26,63 @@ def send_otp_email(user):
     # Strip HTML for plain text version
     plain_message = strip_tags(html_message)
     
-    send_mail(
+    message = EmailMultiAlternatives(
         subject='Your Verification Code - Dental Training Academy',
-        message=plain_message,
-        html_message=html_message,
+        body=plain_message,
         from_email='Dental Training Academy <yourgmail@gmail.com>',
-        recipient_list=[user.email],
-        fail_silently=False,
+        to=[user.email],
     )
+    message.attach_alternative(html_message, 'text/html')
+    return message
+
+def send_otp_email(user):
+    code = generate_otp_code()
+    EmailOTP.objects.create(user=user, code=code)
+    build_otp_email(user, code).send(fail_silently=False)
+
+def deliver_otp_emails(otps, batch_size=500):
+    """
+    Email already-saved OTPs over one SMTP connection, ``batch_size`` messages
+    per send_messages() call. A batch the mail server rejects is logged and
+    counted as failed, and the connection is reopened for the next batch.
+    Returns (sent, failed) email counts.
+    """
+    connection = get_connection(fail_silently=False)
+    sent = failed = 0
+    for start in range(0, len(otps), batch_size):
+        batch = otps[start:start + batch_size]
+        try:
+            connection.open()  # no-op while the connection is up
+            sent += connection.send_messages([build_otp_email(otp.user, otp.code) for otp in batch]) or 0
+        except OSError:  # includes smtplib.SMTPException
+            logger.exception('Failed to send a batch of %d OTP emails', len(batch))
+            failed += len(batch)
+            try:
+                connection.close()
+            except OSError:
+                pass
+    connection.close()
+    if failed:
+        logger.error('Sent %d OTP emails, %d failed', sent, failed)
+    return sent, failed
+
+def queue_otp_emails(users, batch_size=500):
+    """
+    Create OTPs for many users with bulk_create and email them from a
+    background thread once the transaction commits, so the request does not
+    wait on the mail server. Returns the number of emails queued.
+    """
+    otps = EmailOTP.objects.bulk_create([EmailOTP(user=user, code=generate_otp_code()) for user in users])
+    if otps:
+        transaction.on_commit(lambda: threading.Thread(
+            target=deliver_otp_emails, args=(otps, batch_size), name='otp-email-sender',
+        ).start())
+    return len(otps)
     
 def get_client_ip(request):
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
     if x_forwarded_for:
-        return x_forwarded_for.split(',')[0]
+        return x_forwarded_for.split(',')[0].strip()
     return request.META.get('REMOTE_ADDR')
 
 def get_ip_address(request):
@@ -1,9 +1,20 @@
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db.models import Q
 from django.contrib import messages
-from .models import EmailOTP
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from datetime import datetime
+import base64
+import binascii
+import json
+import posixpath
+from .models import EmailOTP, ROLE_CHOICES
+from .events import record_login_event
+from .media import serve_media
+from .search import search_student_ids
 from .utils import send_otp_email, get_client_ip
 from .forms import RegisterForm, LoginForm, OTPForm, ForgotPasswordForm, ResetPasswordForm, ProfileUpdateForm
 
@@ -62,12 +73,13 @@ class LoginView(View):
     def post(self, request):
         form = LoginForm(request.POST)
         if form.is_valid():
-            email = form.cleaned_data['email'].lower()  # Normalize email
+            email = form.cleaned_data['email']  # EmailBackend matches case-insensitively
             password = form.cleaned_data['password']
             user = authenticate(request, email=email, password=password)
             
             # Check if user exists but email is not verified
             if user and not user.is_email_verified:
+                record_login_event(request, email, 'unverified', user)
                 # Send a new OTP for verification
                 send_otp_email(user)
                 messages.info(request, 'Your email is not verified. A new verification code has been sent.')
@@ -79,20 +91,17 @@ class LoginView(View):
                 # Login the user
                 login(request, user)
                 
-                # Update IP address and session key
-                x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-                if x_forwarded_for:
-                    ip = x_forwarded_for.split(',')[0].strip()
-                else:
-                    ip = request.META.get('REMOTE_ADDR')
-                
-                user.last_login_ip = ip
+                # Keep the latest IP and session key on the user row (narrow
+                # update); the full history goes to LoginEvent.
+                user.last_login_ip = get_client_ip(request)
                 user.session_key = request.session.session_key
-                user.save()
+                user.save(update_fields=['last_login_ip', 'session_key'])
+                record_login_event(request, email, 'success', user)
                 
                 messages.success(request, f'Welcome back, {user.first_name}!')
                 return redirect('home')
             else:
+                record_login_event(request, email, 'failed')
                 # Invalid credentials
                 messages.error(request, 'Invalid credentials')
                 return render(request, 'accounts/login.html', {'form': form, 'error': 'Invalid credentials'})
@@ -103,7 +112,7 @@ class LogoutView(View):
         if request.user.is_authenticated:
             # Clear session key before logout
             request.user.session_key = None
-            request.user.save()
+            request.user.save(update_fields=['session_key'])
             logout(request)
             messages.success(request, 'You have been logged out successfully')
         return redirect('login')
@@ -168,4 +177,157 @@ class ProfileUpdateView(LoginRequiredMixin, View):
 
 class ProfileView(LoginRequiredMixin, View):
     def get(self, request):
-        return render(request, 'accounts/profile.html')
\ No newline at end of file
+        return render(request, 'accounts/profile.html')
+
+class ProtectedMediaView(LoginRequiredMixin, View):
+    """
+    Serve MEDIA_ROOT to logged-in users only. Profile photos are limited to
+    their owner, staff, teachers and admins; the bytes themselves are handed
+    off to the web server when MEDIA_SERVE_BACKEND is configured.
+    """
+    def get(self, request, path):
+        path = posixpath.normpath(path).lstrip('/')
+        if path.startswith('profile_photos/') and not self.can_view_photo(request.user, path):
+            raise Http404('Media file does not exist')
+        return serve_media(request, path)
+
+    def can_view_photo(self, user, path):
+        return user.has_staff_role() or user.profile_photo.name == path
+
+class StaffRoleRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
+    """Restrict a view to users with CustomUser.has_staff_role()."""
+
+    def test_func(self):
+        return self.request.user.has_staff_role()
+
+class StudentDirectoryView(StaffRoleRequiredMixin, View):
+    """JSON search over students by name, email, student ID, institute or occupation."""
+    fields = (
+        'id', 'first_name', 'last_name', 'email', 'student_id',
+        'educational_institute', 'current_occupation', 'is_email_verified',
+    )
+    max_limit = 50
+
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        try:
+            limit = min(int(request.GET.get('limit', 20)), self.max_limit)
+        except ValueError:
+            limit = 20
+        if len(query) < 2 or limit < 1:
+            return JsonResponse({'query': query, 'results': []})
+
+        ids = search_student_ids(query, limit)
+        if ids is None:  # no full-text index on this database backend
+            lookup = Q()
+            for field in ('first_name', 'last_name', 'email', 'student_id',
+                          'educational_institute', 'current_occupation'):
+                lookup |= Q(**{f'{field}__icontains': query})
+            results = list(User.objects.filter(lookup, role='student').values(*self.fields)[:limit])
+        else:
+            rows = {row['id']: row for row in User.objects.filter(pk__in=ids).values(*self.fields)}
+            results = [rows[pk] for pk in ids if pk in rows]
+        return JsonResponse({'query': query, 'results': results})
+
+class RosterMixin(StaffRoleRequiredMixin):
+    """
+    Filtering and keyset (seek) pagination over users ordered by
+    (date_joined, id), so deep pages cost the same as the first one and no
+    COUNT(*) is ever needed.
+    """
+    fields = (
+        'id', 'first_name', 'last_name', 'email', 'phone_number', 'student_id', 'role',
+        'is_email_verified', 'educational_institute', 'current_occupation', 'date_joined',
+    )
+
+    def filtered_queryset(self, params):
+        """Return the filtered queryset, or raise ValueError for bad filters."""
+        queryset = User.objects.all()
+        role = params.get('role')
+        if role:
+            if role not in dict(ROLE_CHOICES):
+                raise ValueError(f'Unknown role: {role}')
+            queryset = queryset.filter(role=role)
+        verified = params.get('verified')
+        if verified:
+            if verified not in ('true', 'false'):
+                raise ValueError('verified must be true or false')
+            queryset = queryset.filter(is_email_verified=verified == 'true')
+        year = params.get('year')
+        if year:
+            if not (year.isdigit() and len(year) == 4):
+                raise ValueError('year must be four digits')
+            queryset = queryset.filter(student_id__startswith=f'DTA-{year}-')
+        return queryset.order_by('date_joined', 'id')
+
+    @staticmethod
+    def encode_cursor(row):
+        raw = f"{row['date_joined'].isoformat()}|{row['id']}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            joined, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+            return datetime.fromisoformat(joined), int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise ValueError('Invalid cursor')
+
+    @staticmethod
+    def after(queryset, date_joined, pk):
+        # The OR alone cannot be used as an index range, so every page would
+        # scan from the first row; the separate >= bound gives the seek.
+        return queryset.filter(date_joined__gte=date_joined).filter(
+            Q(date_joined__gt=date_joined) | Q(id__gt=pk)
+        )
+
+class RosterView(RosterMixin, View):
+    """One page of the roster as JSON; follow ``next_cursor`` for the next page."""
+    default_page_size = 100
+    max_page_size = 500
+
+    def get(self, request):
+        try:
+            queryset = self.filtered_queryset(request.GET)
+            cursor = request.GET.get('cursor')
+            if cursor:
+                queryset = self.after(queryset, *self.decode_cursor(cursor))
+            page_size = int(request.GET.get('page_size', self.default_page_size))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        page_size = max(1, min(page_size, self.max_page_size))
+
+        # One extra row tells us whether there is a next page
+        rows = list(queryset.values(*self.fields)[:page_size + 1])
+        next_cursor = self.encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+        return JsonResponse({'results': rows[:page_size], 'next_cursor': next_cursor})
+
+class RosterExportView(RosterMixin, View):
+    """
+    The whole filtered roster as a streamed JSON array. Rows are fetched in
+    keyset-paginated batches, so memory use stays flat however large it is.
+    """
+    batch_size = 1000
+
+    def get(self, request):
+        try:
+            queryset = self.filtered_queryset(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        response = StreamingHttpResponse(self.stream(queryset), content_type='application/json')
+        response['Content-Disposition'] = 'attachment; filename="roster.json"'
+        return response
+
+    def stream(self, queryset):
+        yield '['
+        page = queryset
+        first = True
+        while True:
+            rows = list(page.values(*self.fields)[:self.batch_size])
+            for row in rows:
+                yield ('' if first else ',') + json.dumps(row, cls=DjangoJSONEncoder)
+                first = False
+            if len(rows) < self.batch_size:
+                break
+            page = self.after(queryset, rows[-1]['date_joined'], rows[-1]['id'])
+        yield ']'